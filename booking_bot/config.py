@@ -1,6 +1,7 @@
 import os
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import FrozenSet, List
 
 from dotenv import load_dotenv
 
@@ -26,17 +27,18 @@ def _get_admin_ids(env_value: str | None) -> List[int]:
 @dataclass
 class Settings:
     bot_token: str
-    admin_ids: List[int]
+    admin_ids: FrozenSet[int]
     timezone: str
     database_path: str
 
 
+@lru_cache(maxsize=1)
 def load_settings() -> Settings:
     bot_token = os.getenv("BOT_TOKEN", "")
     if not bot_token:
         raise RuntimeError("BOT_TOKEN is not set. Put it in .env or environment.")
 
-    admin_ids = _get_admin_ids(os.getenv("ADMIN_IDS"))
+    admin_ids = frozenset(_get_admin_ids(os.getenv("ADMIN_IDS")))
     timezone = os.getenv("TZ", os.getenv("TIMEZONE", "Europe/Moscow"))
     database_path = os.getenv("DATABASE_PATH", os.path.abspath("bot.db"))
 
@@ -3,12 +3,13 @@ from __future__ import annotations
 import asyncio
 import aiosqlite
 from dataclasses import dataclass
-from typing import Optional, List, Tuple
-from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional, List, Sequence, Tuple
 from contextlib import asynccontextmanager
 
+from utils import TTLCache
 
-@dataclass
+
+@dataclass(slots=True)
 class User:
     id: int
     tg_user_id: int
@@ -19,7 +20,7 @@ class User:
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Slot:
     id: int
     slot_utc: str  # ISO format in UTC
@@ -30,7 +31,7 @@ class Slot:
     available_tables: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Booking:
     id: int
     user_id: int
@@ -43,28 +44,224 @@ class Booking:
     reminder_enabled: int
 
 
-class Database:
-    def __init__(self, db_path: str):
+# Columns are aliased per table because bookings, users and slots share names like id/created_at
+_BOOKING_SELECT = (
+    "SELECT b.id AS b_id, b.user_id AS b_user_id, b.slot_id AS b_slot_id, b.created_at AS b_created_at, b.reminder_sent AS b_reminder_sent, b.status AS b_status, b.guests_count AS b_guests_count, b.reminder_hours_before AS b_reminder_hours_before, b.reminder_enabled AS b_reminder_enabled, "
+    "u.id AS u_id, u.tg_user_id AS u_tg_user_id, u.chat_id AS u_chat_id, u.full_name AS u_full_name, u.phone AS u_phone, u.is_admin AS u_is_admin, u.created_at AS u_created_at, "
+    "s.id AS s_id, s.slot_utc AS s_slot_utc, s.duration_minutes AS s_duration_minutes, s.note AS s_note, s.created_by AS s_created_by, s.total_tables AS s_total_tables, s.available_tables AS s_available_tables "
+    "FROM bookings b JOIN users u ON u.id = b.user_id JOIN slots s ON s.id = b.slot_id"
+)
+
+
+# Column lists match the dataclass field order so rows can be unpacked positionally
+_USER_COLUMNS = "id, tg_user_id, chat_id, full_name, phone, is_admin, created_at"
+_SLOT_COLUMNS = "s.id, s.slot_utc, s.duration_minutes, s.note, s.created_by, s.total_tables, s.available_tables"
+
+# Query variants are built once here instead of being concatenated on every call
+_Q_USER_BY_TG = "SELECT " + _USER_COLUMNS + " FROM users WHERE tg_user_id = ?"
+
+# Free means available_tables > 0: each booking takes one of the slot's tables, so a slot keeps
+# accepting bookings until the counter reaches zero and no join against bookings is needed
+_Q_FREE = "SELECT " + _SLOT_COLUMNS + " FROM slots s WHERE s.available_tables > 0"
+_Q_FREE_BASE = _Q_FREE + " ORDER BY s.slot_utc ASC"
+_Q_FREE_SINCE = _Q_FREE + " AND s.slot_utc >= ? ORDER BY s.slot_utc ASC"
+_Q_FREE_UNTIL = _Q_FREE + " AND s.slot_utc < ? ORDER BY s.slot_utc ASC"
+_Q_FREE_RANGE = _Q_FREE + " AND s.slot_utc >= ? AND s.slot_utc < ? ORDER BY s.slot_utc ASC"
+
+_Q_SLOT_BY_ID = "SELECT " + _SLOT_COLUMNS + " FROM slots s WHERE s.id = ?"
+
+_Q_BOOKINGS_ALL = _BOOKING_SELECT + " ORDER BY s.slot_utc ASC"
+_Q_BOOKINGS_RANGE = _BOOKING_SELECT + " WHERE s.slot_utc >= ? AND s.slot_utc < ? ORDER BY s.slot_utc ASC"
+
+
+# A slot takes one booking per table, so slot_id is indexed but deliberately not UNIQUE
+_BOOKINGS_DDL = """(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    slot_id INTEGER NOT NULL REFERENCES slots(id) ON DELETE CASCADE,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    reminder_sent INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'booked',
+    guests_count INTEGER NOT NULL DEFAULT 1,
+    reminder_hours_before INTEGER DEFAULT 2,
+    reminder_enabled INTEGER NOT NULL DEFAULT 1
+)"""
+_BOOKINGS_COLUMNS = "id, user_id, slot_id, created_at, reminder_sent, status, guests_count, reminder_hours_before, reminder_enabled"
+_BOOKINGS_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_bookings_slot ON bookings(slot_id)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings(slot_id) "
+    "WHERE reminder_sent = 0 AND reminder_enabled = 1 AND status = 'booked'",
+)
+
+_PENDING_REMINDER = "b.reminder_sent = 0 AND b.reminder_enabled = 1 AND b.status = 'booked'"
+# When a booking's reminder is due, as UNIX seconds
+_REMINDER_AT = "(s.slot_epoch - COALESCE(b.reminder_hours_before, 2) * 3600)"
+# Longest reminder offered by reminder_settings_kb; bounds the indexed slot_epoch range scan
+_MAX_REMINDER_SECONDS = 24 * 3600
+
+# slot_utc as UNIX seconds, computed by SQLite so inserts need not supply it
+_SLOT_EPOCH_DEF = "slot_epoch INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', slot_utc) AS INTEGER)) VIRTUAL"
+
+
+def _user_from_row(r: aiosqlite.Row) -> User:
+    return User(r[0], r[1], r[2], r[3], r[4], r[5], r[6])
+
+
+def _slot_from_row(r: aiosqlite.Row) -> Slot:
+    return Slot(r[0], r[1], r[2], r[3], r[4], r[5], r[6])
+
+
+def _booking_from_row(r: aiosqlite.Row) -> Tuple[Booking, User, Slot]:
+    booking = Booking(
+        id=r["b_id"],
+        user_id=r["b_user_id"],
+        slot_id=r["b_slot_id"],
+        created_at=r["b_created_at"],
+        reminder_sent=r["b_reminder_sent"],
+        status=r["b_status"],
+        guests_count=r["b_guests_count"],
+        reminder_hours_before=r["b_reminder_hours_before"],
+        reminder_enabled=r["b_reminder_enabled"],
+    )
+    user = User(
+        id=r["u_id"],
+        tg_user_id=r["u_tg_user_id"],
+        chat_id=r["u_chat_id"],
+        full_name=r["u_full_name"],
+        phone=r["u_phone"],
+        is_admin=r["u_is_admin"],
+        created_at=r["u_created_at"],
+    )
+    slot = Slot(
+        id=r["s_id"],
+        slot_utc=r["s_slot_utc"],
+        duration_minutes=r["s_duration_minutes"],
+        note=r["s_note"],
+        created_by=r["s_created_by"],
+        total_tables=r["s_total_tables"],
+        available_tables=r["s_available_tables"],
+    )
+    return booking, user, slot
+
+
+async def _has_unique_slot_id(conn: aiosqlite.Connection) -> bool:
+    async with conn.execute("PRAGMA index_list(bookings)") as cur:
+        unique_indexes = [r[1] for r in await cur.fetchall() if r[2]]
+    for name in unique_indexes:
+        async with conn.execute(f"PRAGMA index_info('{name}')") as cur:
+            if [r[2] for r in await cur.fetchall()] == ["slot_id"]:
+                return True
+    return False
+
+
+# Applied to the writer and every reader: wait on locks instead of failing with
+# SQLITE_BUSY, keep temp tables in RAM, 64MB page cache, memory-mapped reads.
+_TUNING_PRAGMAS = (
+    "PRAGMA busy_timeout = 5000;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -64000;",
+    "PRAGMA mmap_size = 268435456;",
+)
+
+
+class ConnectionPool:
+    """One shared writer connection plus a fixed set of read-only connections.
+
+    WAL mode lets readers run alongside the writer, so SELECTs are spread over
+    several aiosqlite threads instead of queueing behind each other.
+    """
+
+    def __init__(self, db_path: str, readers: int = 4):
         self.db_path = db_path
-        self._lock = asyncio.Lock()
+        self.readers = readers
+        self.write_conn: Optional[aiosqlite.Connection] = None
+        self._read_conns: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue(maxsize=readers)
+        # Serializes use of write_conn (and opening/closing the pool); readers never take it
+        self._write_lock = asyncio.Lock()
+
+    async def _connect(self, *pragmas: str) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        for pragma in (*_TUNING_PRAGMAS, *pragmas):
+            await conn.execute(pragma)
+        return conn
+
+    async def open(self) -> None:
+        async with self._write_lock:
+            if self.write_conn is not None:
+                return
+            try:
+                self.write_conn = await self._connect(
+                    "PRAGMA foreign_keys = ON;",
+                    "PRAGMA journal_mode = WAL;",
+                    "PRAGMA synchronous = NORMAL;",
+                )
+                for _ in range(self.readers):
+                    self._read_conns.put_nowait(await self._connect("PRAGMA query_only = 1;"))
+            except Exception as e:
+                await self._close_all()
+                raise RuntimeError(f"Failed to connect to database at {self.db_path}: {e}")
+
+    async def close(self) -> None:
+        async with self._write_lock:
+            await self._close_all()
+
+    async def _close_all(self) -> None:
+        while not self._read_conns.empty():
+            await self._read_conns.get_nowait().close()
+        if self.write_conn is not None:
+            await self.write_conn.close()
+            self.write_conn = None
 
     @asynccontextmanager
-    async def connect(self) -> aiosqlite.Connection:
+    async def acquire_read(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self.write_conn is None:
+            raise RuntimeError("Database is not initialized, call Database.init() first")
+        conn = await self._read_conns.get()
         try:
-            conn = await aiosqlite.connect(self.db_path)
-            await conn.execute("PRAGMA foreign_keys = ON;")
-            await conn.execute("PRAGMA journal_mode = WAL;")
-            await conn.execute("PRAGMA synchronous = NORMAL;")
-            conn.row_factory = aiosqlite.Row
+            yield conn
+        finally:
+            self._read_conns.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire_write(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._write_lock:
+            if self.write_conn is None:
+                raise RuntimeError("Database is not initialized, call Database.init() first")
             try:
-                yield conn
-            finally:
-                await conn.close()
-        except Exception as e:
-            raise RuntimeError(f"Failed to connect to database at {self.db_path}: {e}")
+                yield self.write_conn
+            except BaseException:
+                # Don't leave a half-done transaction on the shared writer
+                await self.write_conn.rollback()
+                raise
+
+
+class Database:
+    def __init__(self, db_path: str, read_pool_size: int = 4):
+        self.db_path = db_path
+        self._pool = ConnectionPool(db_path, readers=read_pool_size)
+        self._initialized = False
+        # Bumped on every committed change to slots or bookings, lets callers cache derived views
+        self.slots_version = 0
+        # tg_user_id -> User; phone/name rarely change and every handler looks the user up
+        self._user_cache = TTLCache(maxsize=10_000, ttl=60)
+
+    async def close(self) -> None:
+        if self._pool.write_conn is not None:
+            await self.optimize()
+        await self._pool.close()
+        self._initialized = False
+
+    async def optimize(self) -> None:
+        # Refreshes planner statistics; cheap when nothing changed, meant to run periodically
+        async with self._pool.acquire_write() as conn:
+            await conn.execute("PRAGMA optimize;")
 
     async def init(self) -> None:
-        async with self.connect() as conn:
+        if self._initialized:
+            return
+        await self._pool.open()
+        async with self._pool.acquire_write() as conn:
             await conn.executescript(
                 """
                 CREATE TABLE IF NOT EXISTS users (
@@ -85,79 +282,119 @@ class Database:
                     created_by INTEGER,
                     total_tables INTEGER NOT NULL DEFAULT 1,
                     available_tables INTEGER NOT NULL DEFAULT 1,
+                    """ + _SLOT_EPOCH_DEF + """,
                     UNIQUE(slot_utc)
                 );
 
-                CREATE TABLE IF NOT EXISTS bookings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    slot_id INTEGER NOT NULL UNIQUE REFERENCES slots(id) ON DELETE CASCADE,
-                    created_at TEXT NOT NULL DEFAULT (datetime('now')),
-                    reminder_sent INTEGER NOT NULL DEFAULT 0,
-                    status TEXT NOT NULL DEFAULT 'booked',
-                    guests_count INTEGER NOT NULL DEFAULT 1,
-                    reminder_hours_before INTEGER DEFAULT 2,
-                    reminder_enabled INTEGER NOT NULL DEFAULT 1
-                );
+                CREATE TABLE IF NOT EXISTS bookings """ + _BOOKINGS_DDL + """;
+
+                -- slot_utc is already indexed through UNIQUE(slot_utc); this covers the free-slot filter
+                CREATE INDEX IF NOT EXISTS idx_slots_free ON slots(slot_utc) WHERE available_tables > 0;
                 """
             )
+            # Databases created with bookings.slot_id UNIQUE allowed one booking per slot whatever its
+            # table count; SQLite cannot drop a constraint, so the table is rebuilt without it
+            if await _has_unique_slot_id(conn):
+                await conn.execute("CREATE TABLE bookings_new " + _BOOKINGS_DDL)
+                await conn.execute(
+                    "INSERT INTO bookings_new (" + _BOOKINGS_COLUMNS + ") SELECT " + _BOOKINGS_COLUMNS + " FROM bookings"
+                )
+                await conn.execute("DROP TABLE bookings")
+                await conn.execute("ALTER TABLE bookings_new RENAME TO bookings")
+            for statement in _BOOKINGS_INDEXES:
+                await conn.execute(statement)
+            # Databases created before slot_epoch existed get it added in place
+            async with conn.execute("PRAGMA table_xinfo(slots)") as cur:
+                columns = {r[1] for r in await cur.fetchall()}
+            if "slot_epoch" not in columns:
+                await conn.execute("ALTER TABLE slots ADD COLUMN " + _SLOT_EPOCH_DEF)
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_slots_epoch ON slots(slot_epoch)")
+            await conn.execute("ANALYZE;")
+            await conn.execute("PRAGMA optimize;")
             await conn.commit()
+        self._initialized = True
 
     # Users
     async def upsert_user(self, tg_user_id: int, chat_id: int, full_name: str, is_admin: int) -> int:
-        async with self.connect() as conn:
-            await conn.execute(
+        async with self._pool.acquire_write() as conn:
+            async with conn.execute(
                 """
                 INSERT INTO users (tg_user_id, chat_id, full_name, is_admin)
                 VALUES (?, ?, ?, ?)
                 ON CONFLICT(tg_user_id) DO UPDATE SET chat_id=excluded.chat_id, full_name=excluded.full_name, is_admin=excluded.is_admin
+                RETURNING id
                 """,
                 (tg_user_id, chat_id, full_name, is_admin),
-            )
-            await conn.commit()
-            async with conn.execute("SELECT id FROM users WHERE tg_user_id = ?", (tg_user_id,)) as cur:
+            ) as cur:
                 row = await cur.fetchone()
-                return int(row[0])
+            await conn.commit()
+        self._user_cache.pop(tg_user_id)
+        return int(row[0])
 
     async def set_user_phone(self, tg_user_id: int, phone: str) -> None:
-        async with self.connect() as conn:
+        async with self._pool.acquire_write() as conn:
             await conn.execute("UPDATE users SET phone = ? WHERE tg_user_id = ?", (phone, tg_user_id))
             await conn.commit()
+        self._user_cache.pop(tg_user_id)
 
     async def get_user_by_tg(self, tg_user_id: int) -> Optional[User]:
-        async with self.connect() as conn:
-            async with conn.execute("SELECT * FROM users WHERE tg_user_id = ?", (tg_user_id,)) as cur:
+        user = self._user_cache.get(tg_user_id)
+        if user is not None:
+            return user
+        async with self._pool.acquire_read() as conn:
+            async with conn.execute(_Q_USER_BY_TG, (tg_user_id,)) as cur:
                 row = await cur.fetchone()
                 if not row:
                     return None
-                return User(**dict(row))
+                user = _user_from_row(row)
+        self._user_cache[tg_user_id] = user
+        return user
 
     # Slots
     async def add_slot(self, slot_utc_iso: str, duration_minutes: int = 60, note: Optional[str] = None, created_by: Optional[int] = None, total_tables: int = 1) -> int:
-        async with self.connect() as conn:
-            await conn.execute(
-                "INSERT OR IGNORE INTO slots (slot_utc, duration_minutes, note, created_by, total_tables, available_tables) VALUES (?, ?, ?, ?, ?, ?)",
+        async with self._pool.acquire_write() as conn:
+            async with conn.execute(
+                "INSERT OR IGNORE INTO slots (slot_utc, duration_minutes, note, created_by, total_tables, available_tables) VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
                 (slot_utc_iso, duration_minutes, note, created_by, total_tables, total_tables),
+            ) as cur:
+                row = await cur.fetchone()
+            await conn.commit()
+            self.slots_version += 1
+            if row is None:
+                # Slot already existed, the insert was ignored
+                async with conn.execute("SELECT id FROM slots WHERE slot_utc = ?", (slot_utc_iso,)) as cur:
+                    row = await cur.fetchone()
+            return int(row[0])
+
+    async def add_slots_bulk(self, items: List[Tuple[str, int, Optional[str], Optional[int]]]) -> int:
+        # items: (slot_utc_iso, duration_minutes, note, created_by), inserted in a single transaction
+        # Returns how many slots were created; times that already exist are skipped
+        async with self._pool.acquire_write() as conn:
+            await conn.execute("BEGIN")
+            cur = await conn.executemany(
+                "INSERT OR IGNORE INTO slots (slot_utc, duration_minutes, note, created_by) VALUES (?, ?, ?, ?)",
+                items,
             )
             await conn.commit()
-            async with conn.execute("SELECT id FROM slots WHERE slot_utc = ?", (slot_utc_iso,)) as cur:
-                row = await cur.fetchone()
-                return int(row[0])
+            self.slots_version += 1
+            return cur.rowcount
 
     async def delete_slot(self, slot_id: int) -> int:
-        async with self.connect() as conn:
+        async with self._pool.acquire_write() as conn:
             cur = await conn.execute("DELETE FROM slots WHERE id = ?", (slot_id,))
             await conn.commit()
+            self.slots_version += 1
             return cur.rowcount
 
     async def update_slot_note(self, slot_id: int, note: str) -> bool:
-        async with self.connect() as conn:
+        async with self._pool.acquire_write() as conn:
             cur = await conn.execute("UPDATE slots SET note = ? WHERE id = ?", (note, slot_id))
             await conn.commit()
+            self.slots_version += 1
             return cur.rowcount > 0
 
     async def update_slot_tables(self, slot_id: int, total_tables: int) -> bool:
-        async with self.connect() as conn:
+        async with self._pool.acquire_write() as conn:
             # Получаем количество забронированных столиков
             async with conn.execute(
                 "SELECT COUNT(*) FROM bookings WHERE slot_id = ?", (slot_id,)
@@ -173,58 +410,49 @@ class Database:
                 (total_tables, available_tables, slot_id)
             )
             await conn.commit()
+            self.slots_version += 1
             return cur.rowcount > 0
 
-    async def list_free_slots(self, since_utc_iso: Optional[str] = None, date_only: Optional[str] = None) -> List[Slot]:
-        query = (
-            "SELECT s.* FROM slots s "
-            "WHERE s.available_tables > 0"
-        )
-        params: List[str] = []
-        if since_utc_iso:
-            query += " AND s.slot_utc >= ?"
-            params.append(since_utc_iso)
-        if date_only:
-            # date_only is YYYY-MM-DD in UTC day; we filter by day boundaries in UTC
-            query += " AND s.slot_utc >= ? AND s.slot_utc < ?"
-            start = f"{date_only}T00:00:00+00:00"
-            end = f"{date_only}T23:59:59+00:00"
-            params.extend([start, end])
-        query += " ORDER BY s.slot_utc ASC"
-
-        async with self.connect() as conn:
-            async with conn.execute(query, params) as cur:
-                rows = await cur.fetchall()
-                return [Slot(**dict(r)) for r in rows]
-
-    async def list_slots(self, date_only: Optional[str] = None) -> List[Slot]:
-        query = "SELECT * FROM slots"
-        params: List[str] = []
-        if date_only:
-            query += " WHERE slot_utc >= ? AND slot_utc < ?"
-            start = f"{date_only}T00:00:00+00:00"
-            end = f"{date_only}T23:59:59+00:00"
-            params.extend([start, end])
-        query += " ORDER BY slot_utc ASC"
-        async with self.connect() as conn:
+    async def list_free_slots(self, since_utc_iso: Optional[str] = None, until_utc_iso: Optional[str] = None) -> List[Slot]:
+        # [since_utc_iso, until_utc_iso) is a UTC range, either end optional
+        if since_utc_iso and until_utc_iso:
+            query, params = _Q_FREE_RANGE, (since_utc_iso, until_utc_iso)
+        elif since_utc_iso:
+            query, params = _Q_FREE_SINCE, (since_utc_iso,)
+        elif until_utc_iso:
+            query, params = _Q_FREE_UNTIL, (until_utc_iso,)
+        else:
+            query, params = _Q_FREE_BASE, ()
+        async with self._pool.acquire_read() as conn:
             async with conn.execute(query, params) as cur:
                 rows = await cur.fetchall()
-                return [Slot(**dict(r)) for r in rows]
+                return [_slot_from_row(r) for r in rows]
+
+    async def get_slot(self, slot_id: int) -> Optional[Slot]:
+        async with self._pool.acquire_read() as conn:
+            async with conn.execute(_Q_SLOT_BY_ID, (slot_id,)) as cur:
+                row = await cur.fetchone()
+                if not row:
+                    return None
+                return _slot_from_row(row)
 
     # Bookings
-    async def create_booking(self, user_id: int, slot_id: int, guests_count: int = 1, reminder_hours_before: Optional[int] = 2, reminder_enabled: int = 1) -> int:
-        async with self.connect() as conn:
+    async def create_booking(self, user_id: int, slot_id: int, guests_count: int = 1, reminder_hours_before: Optional[int] = 2, reminder_enabled: int = 1) -> Optional[int]:
+        # Returns None when the slot is gone or all of its tables are booked. The check and the INSERT
+        # share the writer under _write_lock, so no other booking can take the last table in between.
+        async with self._pool.acquire_write() as conn:
             # Проверяем, есть ли доступные столики
             async with conn.execute("SELECT available_tables FROM slots WHERE id = ?", (slot_id,)) as cur:
                 row = await cur.fetchone()
                 if not row or row[0] <= 0:
-                    raise RuntimeError("Нет доступных столиков для этого времени")
+                    return None
             
             # Создаем бронирование
-            await conn.execute(
+            cur = await conn.execute(
                 "INSERT INTO bookings (user_id, slot_id, guests_count, reminder_hours_before, reminder_enabled) VALUES (?, ?, ?, ?, ?)",
                 (user_id, slot_id, guests_count, reminder_hours_before, reminder_enabled),
             )
+            booking_id = cur.lastrowid
             
             # Уменьшаем количество доступных столиков
             await conn.execute(
@@ -233,102 +461,72 @@ class Database:
             )
             
             await conn.commit()
-            async with conn.execute("SELECT id FROM bookings WHERE user_id = ? AND slot_id = ?", (user_id, slot_id)) as cur:
-                row = await cur.fetchone()
-                return int(row[0])
+            self.slots_version += 1
+            return int(booking_id)
 
     async def get_booking_with_user_and_slot(self, booking_id: int) -> Optional[Tuple[Booking, User, Slot]]:
-        async with self.connect() as conn:
-            async with conn.execute(
-                """
-                SELECT b.*, u.*, s.*
-                FROM bookings b
-                JOIN users u ON u.id = b.user_id
-                JOIN slots s ON s.id = b.slot_id
-                WHERE b.id = ?
-                """,
-                (booking_id,),
-            ) as cur:
+        async with self._pool.acquire_read() as conn:
+            async with conn.execute(_BOOKING_SELECT + " WHERE b.id = ?", (booking_id,)) as cur:
                 row = await cur.fetchone()
                 if not row:
                     return None
-                # Row mapping when selecting * from multiple tables is messy; instead query separately when needed.
-                return None
+                return _booking_from_row(row)
 
-    async def list_bookings(self, date_only: Optional[str] = None) -> List[Tuple[Booking, User, Slot]]:
-        query = (
-            "SELECT b.id AS b_id, b.user_id AS b_user_id, b.slot_id AS b_slot_id, b.created_at AS b_created_at, b.reminder_sent AS b_reminder_sent, b.status AS b_status, b.guests_count AS b_guests_count, b.reminder_hours_before AS b_reminder_hours_before, b.reminder_enabled AS b_reminder_enabled, "
-            "u.id AS u_id, u.tg_user_id AS u_tg_user_id, u.chat_id AS u_chat_id, u.full_name AS u_full_name, u.phone AS u_phone, u.is_admin AS u_is_admin, u.created_at AS u_created_at, "
-            "s.id AS s_id, s.slot_utc AS s_slot_utc, s.duration_minutes AS s_duration_minutes, s.note AS s_note, s.created_by AS s_created_by, s.total_tables AS s_total_tables, s.available_tables AS s_available_tables "
-            "FROM bookings b JOIN users u ON u.id = b.user_id JOIN slots s ON s.id = b.slot_id"
-        )
-        params: List[str] = []
-        if date_only:
-            query += " WHERE s.slot_utc >= ? AND s.slot_utc < ?"
-            start = f"{date_only}T00:00:00+00:00"
-            end = f"{date_only}T23:59:59+00:00"
-            params.extend([start, end])
-        query += " ORDER BY s.slot_utc ASC"
-        async with self.connect() as conn:
+    async def list_bookings(self, utc_range: Optional[Tuple[str, str]] = None) -> List[Tuple[Booking, User, Slot]]:
+        return [row async for row in self.iter_bookings(utc_range)]
+
+    async def iter_bookings(self, utc_range: Optional[Tuple[str, str]] = None) -> AsyncIterator[Tuple[Booking, User, Slot]]:
+        # utc_range is a UTC ISO [start, end) window, e.g. a local day from utils.local_day_utc_bounds
+        if utc_range:
+            query, params = _Q_BOOKINGS_RANGE, utc_range
+        else:
+            query, params = _Q_BOOKINGS_ALL, ()
+        async with self._pool.acquire_read() as conn:
             async with conn.execute(query, params) as cur:
-                rows = await cur.fetchall()
-                result: List[Tuple[Booking, User, Slot]] = []
-                for r in rows:
-                    booking = Booking(
-                        id=r["b_id"],
-                        user_id=r["b_user_id"],
-                        slot_id=r["b_slot_id"],
-                        created_at=r["b_created_at"],
-                        reminder_sent=r["b_reminder_sent"],
-                        status=r["b_status"],
-                        guests_count=r["b_guests_count"],
-                        reminder_hours_before=r["b_reminder_hours_before"],
-                        reminder_enabled=r["b_reminder_enabled"],
-                    )
-                    user = User(
-                        id=r["u_id"],
-                        tg_user_id=r["u_tg_user_id"],
-                        chat_id=r["u_chat_id"],
-                        full_name=r["u_full_name"],
-                        phone=r["u_phone"],
-                        is_admin=r["u_is_admin"],
-                        created_at=r["u_created_at"],
-                    )
-                    slot = Slot(
-                        id=r["s_id"],
-                        slot_utc=r["s_slot_utc"],
-                        duration_minutes=r["s_duration_minutes"],
-                        note=r["s_note"],
-                        created_by=r["s_created_by"],
-                        total_tables=r["s_total_tables"],
-                        available_tables=r["s_available_tables"],
-                    )
-                    result.append((booking, user, slot))
-                return result
+                while rows := await cur.fetchmany(250):
+                    for r in rows:
+                        yield _booking_from_row(r)
 
     async def mark_reminder_sent(self, booking_id: int) -> None:
-        async with self.connect() as conn:
+        async with self._pool.acquire_write() as conn:
             await conn.execute("UPDATE bookings SET reminder_sent = 1 WHERE id = ?", (booking_id,))
             await conn.commit()
 
-    async def find_bookings_for_reminder(self, now_utc: datetime) -> List[Tuple[int, int, int, str, int]]:
+    async def mark_reminders_sent(self, booking_ids: Sequence[int]) -> None:
+        if not booking_ids:
+            return
+        placeholders = ",".join("?" * len(booking_ids))
+        async with self._pool.acquire_write() as conn:
+            await conn.execute(f"UPDATE bookings SET reminder_sent = 1 WHERE id IN ({placeholders})", tuple(booking_ids))
+            await conn.commit()
+
+    async def find_bookings_for_reminder(self, now_epoch: int) -> List[Tuple[int, int, int, str, int]]:
         # Returns tuples: (booking_id, user_chat_id, slot_id, slot_utc_iso, reminder_hours_before)
-        # window: send when slot_time - now in [reminder_hours_before, reminder_hours_before + 60s)
-        # We need to check each booking's reminder settings
+        # window: send when the reminder time (slot_time - reminder_hours_before) is in (now - 60s, now]
+        # The slot_epoch range narrows the scan through idx_slots_epoch before the per-booking check
         query = (
-            "SELECT b.id AS booking_id, u.chat_id AS chat_id, s.id AS slot_id, s.slot_utc AS slot_utc, b.reminder_hours_before AS reminder_hours_before "
+            "SELECT b.id, u.chat_id, s.id, s.slot_utc, COALESCE(b.reminder_hours_before, 2) "
             "FROM bookings b JOIN users u ON u.id = b.user_id JOIN slots s ON s.id = b.slot_id "
-            "WHERE b.reminder_sent = 0 AND b.reminder_enabled = 1 AND b.status = 'booked'"
+            "WHERE s.slot_epoch BETWEEN :now - 60 AND :now + :horizon "
+            "AND " + _PENDING_REMINDER + " "
+            "AND " + _REMINDER_AT + " > :now - 60 "
+            "AND " + _REMINDER_AT + " <= :now"
         )
-        async with self.connect() as conn:
-            async with conn.execute(query) as cur:
+        async with self._pool.acquire_read() as conn:
+            async with conn.execute(query, {"now": now_epoch, "horizon": _MAX_REMINDER_SECONDS}) as cur:
                 rows = await cur.fetchall()
-                result = []
-                for r in rows:
-                    reminder_hours = r["reminder_hours_before"] or 2  # default to 2 hours
-                    lower = now_utc + timedelta(hours=reminder_hours)
-                    upper = lower + timedelta(seconds=60)
-                    slot_time = datetime.fromisoformat(r["slot_utc"].replace('Z', '+00:00'))
-                    if lower <= slot_time < upper:
-                        result.append((r["booking_id"], r["chat_id"], r["slot_id"], r["slot_utc"], reminder_hours))
-                return result
\ No newline at end of file
+                return [(r[0], r[1], r[2], r[3], r[4]) for r in rows]
+
+    async def next_reminder_due(self, now_epoch: int) -> Optional[int]:
+        # Earliest reminder time (UNIX seconds) strictly after now, None when nothing is pending
+        query = (
+            "SELECT MIN(" + _REMINDER_AT + ") "
+            "FROM bookings b JOIN slots s ON s.id = b.slot_id "
+            "WHERE s.slot_epoch > :now "
+            "AND " + _PENDING_REMINDER + " "
+            "AND " + _REMINDER_AT + " > :now"
+        )
+        async with self._pool.acquire_read() as conn:
+            async with conn.execute(query, {"now": now_epoch}) as cur:
+                row = await cur.fetchone()
+                return None if not row or row[0] is None else int(row[0])
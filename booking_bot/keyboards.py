@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import List, Tuple, Optional
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
+_CHOOSE_DATE = "choose_date:"
+_SELECT_TIME = "select_time:"
+_CONFIRM_BOOKING = "confirm_booking:"
+
+
+# Static markups are built once and dynamic ones are memoized by their content. The cached
+# objects are shared between callers, which is safe only because nothing mutates a markup
+# after it is built (aiogram models are not frozen).
+@lru_cache(maxsize=1)
 def contact_request_kb() -> ReplyKeyboardMarkup:
     kb = ReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text="Отправить номер", request_contact=True)]],
@@ -16,10 +26,15 @@ def contact_request_kb() -> ReplyKeyboardMarkup:
 
 
 def dates_kb(dates_iso: List[str]) -> InlineKeyboardMarkup:
+    return _dates_kb(tuple(dates_iso))
+
+
+@lru_cache(maxsize=256)
+def _dates_kb(dates_iso: Tuple[str, ...]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for date_iso in dates_iso:
         # date_iso format YYYY-MM-DD
-        builder.button(text=date_iso, callback_data=f"choose_date:{date_iso}")
+        builder.button(text=date_iso, callback_data="".join((_CHOOSE_DATE, date_iso)))
     builder.adjust(2)
     builder.button(text="Обновить", callback_data="refresh_dates")
     builder.button(text="Отмена", callback_data="cancel")
@@ -27,6 +42,11 @@ def dates_kb(dates_iso: List[str]) -> InlineKeyboardMarkup:
 
 
 def times_kb(pairs: List[Tuple[int, str, Optional[str], int]]) -> InlineKeyboardMarkup:
+    return _times_kb(tuple(pairs))
+
+
+@lru_cache(maxsize=256)
+def _times_kb(pairs: Tuple[Tuple[int, str, Optional[str], int], ...]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for slot_id, label, note, available_tables in pairs:
         # Add note and available tables to button text
@@ -34,13 +54,14 @@ def times_kb(pairs: List[Tuple[int, str, Optional[str], int]]) -> InlineKeyboard
         if note:
             button_text += f" ({note})"
         button_text += f" [{available_tables} столик(ов)]"
-        builder.button(text=button_text, callback_data=f"select_time:{slot_id}")
+        builder.button(text=button_text, callback_data="".join((_SELECT_TIME, str(slot_id))))
     builder.adjust(2)
     builder.button(text="Назад", callback_data="back_to_dates")
     builder.button(text="Отмена", callback_data="cancel")
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def guests_count_kb() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for i in range(1, 9):  # 1-8 guests
@@ -50,6 +71,7 @@ def guests_count_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def reminder_settings_kb() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="За 1 час", callback_data="reminder:1")
@@ -66,6 +88,7 @@ def reminder_settings_kb() -> InlineKeyboardMarkup:
 
 def confirm_booking_kb(slot_id: int, guests_count: int, reminder_hours: Optional[int]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    builder.button(text="✅ Подтвердить", callback_data=f"confirm_booking:{slot_id}:{guests_count}:{reminder_hours or 0}")
+    callback_data = "".join((_CONFIRM_BOOKING, str(slot_id), ":", str(guests_count), ":", str(reminder_hours or 0)))
+    builder.button(text="✅ Подтвердить", callback_data=callback_data)
     builder.button(text="❌ Отмена", callback_data="cancel")
     return builder.as_markup()
\ No newline at end of file
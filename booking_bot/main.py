@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import List, Tuple, Optional
+import re
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Set, Tuple, Optional
 from datetime import datetime, timezone
 
 from aiogram import Bot, Dispatcher, F, Router
@@ -13,9 +16,9 @@ from aiogram.utils.markdown import hbold
 from aiogram.client.default import DefaultBotProperties
 
 from config import load_settings
-from db import Database, Slot
+from db import Booking, Database, Slot, User
 from keyboards import contact_request_kb, dates_kb, times_kb, guests_count_kb, reminder_settings_kb, confirm_booking_kb
-from utils import local_to_utc_iso, utc_iso_to_local_str, unique_sorted_dates_local
+from utils import TTLCache, local_day_utc_bounds, local_to_utc_iso, utc_iso_to_local_str, group_free_by_local_date
 
 
 logging.basicConfig(level=logging.INFO)
@@ -30,8 +33,17 @@ router = Router()
 dp.include_router(router)
 db = Database(settings.database_path)
 
-# Simple session storage for booking flow
-booking_sessions = {}
+# Simple session storage for booking flow; abandoned sessions expire after 10 minutes
+booking_sessions = TTLCache(maxsize=10_000, ttl=600)
+
+# Set after a booking is created so reminder_worker re-reads the next due reminder
+reminder_wakeup = asyncio.Event()
+
+# Strong references to fire-and-forget tasks; the event loop only keeps weak ones
+_background_tasks: Set[asyncio.Task] = set()
+
+# /addslots arguments: "HH:MM" times and a bare number (duration), each a whole whitespace-separated token
+_HHMM_OR_NUM = re.compile(r"\s*(?:(\d{1,2}:\d{2})|(\d+))(?!\S)")
 
 
 async def ensure_user_record(message: Message) -> int:
@@ -48,32 +60,60 @@ async def ensure_user_record(message: Message) -> int:
     return user_id
 
 
+# Free slots grouped by local date, shared by the dates and times keyboards, plus the sorted date list.
+# Rebuilt when the slot table changes (db.slots_version) or the minute rolls over.
+_free_by_date: Optional[Tuple[Tuple[int, int], Dict[str, List[Tuple[int, str, Optional[str], int]]], List[str]]] = None
+# Concurrent callers that find the cache stale wait for one rebuild instead of each querying the database
+_free_by_date_lock = asyncio.Lock()
+
+
+@lru_cache(maxsize=1)
+def _now_iso_minute(minute_key: int) -> str:
+    # Start of the minute minute_key (minutes since epoch) as UTC ISO; shared by all requests in that minute
+    return datetime.fromtimestamp(minute_key * 60, timezone.utc).isoformat()
+
+
+async def _free_slots_cache() -> Tuple[Tuple[int, int], Dict[str, List[Tuple[int, str, Optional[str], int]]], List[str]]:
+    global _free_by_date
+    minute_key = int(time.time()) // 60
+    key = (db.slots_version, minute_key)
+    if _free_by_date is not None and _free_by_date[0] == key:
+        return _free_by_date
+    async with _free_by_date_lock:
+        if _free_by_date is None or _free_by_date[0] != key:
+            free = await db.list_free_slots(since_utc_iso=_now_iso_minute(minute_key))
+            buckets = group_free_by_local_date(free, settings.timezone)
+            _free_by_date = (key, buckets, sorted(buckets))
+        return _free_by_date
+
+
 async def list_dates_keyboard() -> Tuple[str, Optional[List[str]]]:
-    free = await db.list_free_slots(since_utc_iso=datetime.now(timezone.utc).isoformat())
-    if not free:
+    dates = (await _free_slots_cache())[2]
+    if not dates:
         return ("На ближайшее время свободных слотов нет. Попробуйте позже.", None)
-    dates_local = unique_sorted_dates_local([s.slot_utc for s in free], settings.timezone)
-    return ("Выберите дату:", dates_local)
+    return ("Выберите дату:", dates)
 
 
 async def list_times_keyboard(date_local: str) -> Tuple[str, Optional[List[Tuple[int, str, Optional[str], int]]]]:
-    # Need to find free slots for that local date
-    # To avoid DST issues, convert all free slots to local and filter by date string
-    free = await db.list_free_slots(since_utc_iso=None)
-    pairs: List[Tuple[int, str, Optional[str], int]] = []
-    for s in free:
-        d_str, t_str = utc_iso_to_local_str(s.slot_utc, settings.timezone)
-        if d_str == date_local:
-            pairs.append((s.id, t_str, s.note, s.available_tables))
-    pairs.sort(key=lambda x: x[1])
+    pairs = (await _free_slots_cache())[1].get(date_local)
     if not pairs:
         return (f"На дату {date_local} свободных слотов нет.", None)
     return (f"Свободное время на {date_local}:", pairs)
 
 
+async def show_dates(target: Message | CallbackQuery) -> None:
+    # Sends the dates keyboard as a new message, or edits the callback's message in place
+    text, dates = await list_dates_keyboard()
+    markup = None if dates is None else dates_kb(dates)
+    if isinstance(target, CallbackQuery):
+        await target.message.edit_text(text, reply_markup=markup)  # type: ignore[union-attr]
+        await target.answer()
+    else:
+        await target.answer(text, reply_markup=markup)
+
+
 @router.message(CommandStart())
 async def on_start(message: Message):
-    await db.init()
     await ensure_user_record(message)
     user = await db.get_user_by_tg(message.from_user.id)  # type: ignore[arg-type]
     if not user or not user.phone:
@@ -83,11 +123,7 @@ async def on_start(message: Message):
         )
         return
 
-    text, dates = await list_dates_keyboard()
-    if dates is None:
-        await message.answer(text)
-    else:
-        await message.answer(text, reply_markup=dates_kb(dates))
+    await show_dates(message)
 
 
 @router.message(F.contact)
@@ -97,27 +133,15 @@ async def on_contact(message: Message):
     await ensure_user_record(message)
     await db.set_user_phone(message.from_user.id, message.contact.phone_number)  # type: ignore[arg-type]
     await message.answer("Спасибо! Теперь выберите дату и время для записи.")
-    text, dates = await list_dates_keyboard()
-    if dates is None:
-        await message.answer(text)
-    else:
-        await message.answer(text, reply_markup=dates_kb(dates))
+    await show_dates(message)
 
 
-@router.callback_query(F.data == "refresh_dates")
-async def on_refresh_dates(callback: CallbackQuery):
-    text, dates = await list_dates_keyboard()
-    if dates is None:
-        await callback.message.edit_text(text)  # type: ignore[union-attr]
-    else:
-        await callback.message.edit_text(text, reply_markup=dates_kb(dates))  # type: ignore[union-attr]
-    await callback.answer()
+async def on_refresh_dates(callback: CallbackQuery, payload: str):
+    await show_dates(callback)
 
 
-@router.callback_query(F.data.startswith("choose_date:"))
-async def on_choose_date(callback: CallbackQuery):
-    date_local = callback.data.split(":", 1)[1]  # type: ignore[union-attr]
-    text, pairs = await list_times_keyboard(date_local)
+async def on_choose_date(callback: CallbackQuery, payload: str):
+    text, pairs = await list_times_keyboard(payload)
     if pairs is None:
         await callback.message.edit_text(text)  # type: ignore[union-attr]
     else:
@@ -126,25 +150,18 @@ async def on_choose_date(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data == "back_to_dates")
-async def on_back_to_dates(callback: CallbackQuery):
-    text, dates = await list_dates_keyboard()
-    if dates is None:
-        await callback.message.edit_text(text)  # type: ignore[union-attr]
-    else:
-        await callback.message.edit_text(text, reply_markup=dates_kb(dates))  # type: ignore[union-attr]
-    await callback.answer()
+async def on_back_to_dates(callback: CallbackQuery, payload: str):
+    await show_dates(callback)
 
 
-@router.callback_query(F.data == "cancel")
-async def on_cancel(callback: CallbackQuery):
+async def on_cancel(callback: CallbackQuery, payload: str):
+    booking_sessions.pop(callback.from_user.id)
     await callback.message.edit_text("Отменено.")  # type: ignore[union-attr]
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("select_time:"))
-async def on_select_time(callback: CallbackQuery):
-    slot_id = int(callback.data.split(":", 1)[1])  # type: ignore[union-attr]
+async def on_select_time(callback: CallbackQuery, payload: str):
+    slot_id = int(payload)
     tg_user = callback.from_user
     user = await db.get_user_by_tg(tg_user.id)
     if not user or not user.phone:
@@ -162,14 +179,14 @@ async def on_select_time(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("guests:"))
-async def on_guests_count(callback: CallbackQuery):
-    guests_count = int(callback.data.split(":", 1)[1])  # type: ignore[union-attr]
+async def on_guests_count(callback: CallbackQuery, payload: str):
+    guests_count = int(payload)
     tg_user = callback.from_user
     
     # Store guests count in session
-    if tg_user.id in booking_sessions:
-        booking_sessions[tg_user.id]["guests_count"] = guests_count
+    session = booking_sessions.get(tg_user.id)
+    if session is not None:
+        session["guests_count"] = guests_count
     
     await callback.message.edit_text(  # type: ignore[union-attr]
         f"Выбрано гостей: {guests_count}\n\n"
@@ -179,9 +196,8 @@ async def on_guests_count(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("reminder:"))
-async def on_reminder_setting(callback: CallbackQuery):
-    reminder_hours = int(callback.data.split(":", 1)[1])  # type: ignore[union-attr]
+async def on_reminder_setting(callback: CallbackQuery, payload: str):
+    reminder_hours = int(payload)
     tg_user = callback.from_user
     
     # Get data from session
@@ -194,7 +210,7 @@ async def on_reminder_setting(callback: CallbackQuery):
         return
     
     # Store reminder setting in session
-    booking_sessions[tg_user.id]["reminder_hours"] = reminder_hours if reminder_hours > 0 else None
+    session["reminder_hours"] = reminder_hours if reminder_hours > 0 else None
     
     # Show confirmation with all details
     reminder_text = "Без напоминания" if reminder_hours == 0 else f"За {reminder_hours} час(ов)"
@@ -208,12 +224,11 @@ async def on_reminder_setting(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("confirm_booking:"))
-async def on_confirm_booking(callback: CallbackQuery):
-    parts = callback.data.split(":")  # type: ignore[union-attr]
-    slot_id = int(parts[1])
-    guests_count = int(parts[2])
-    reminder_hours = int(parts[3]) if parts[3] != "0" else None
+async def on_confirm_booking(callback: CallbackQuery, payload: str):
+    slot_part, guests_part, reminder_part = payload.split(":", 2)
+    slot_id = int(slot_part)
+    guests_count = int(guests_part)
+    reminder_hours = int(reminder_part) if reminder_part != "0" else None
     
     tg_user = callback.from_user
     user = await db.get_user_by_tg(tg_user.id)
@@ -221,21 +236,18 @@ async def on_confirm_booking(callback: CallbackQuery):
         await callback.answer("Сначала поделитесь номером телефона через /start", show_alert=True)
         return
     
-    try:
-        booking_id = await db.create_booking(
-            user.id, 
-            slot_id, 
-            guests_count=guests_count,
-            reminder_hours_before=reminder_hours,
-            reminder_enabled=1 if reminder_hours is not None else 0
-        )
-    except Exception as e:  # typically UNIQUE constraint
-        logger.exception("Booking failed: %s", e)
+    booking_id = await db.create_booking(
+        user.id, 
+        slot_id, 
+        guests_count=guests_count,
+        reminder_hours_before=reminder_hours,
+        reminder_enabled=1 if reminder_hours is not None else 0
+    )
+    if booking_id is None:
         await callback.answer("Увы, этот слот только что заняли. Выберите другой.", show_alert=True)
         # refresh times list
         # find date of slot to refresh list
-        slots = await db.list_slots()
-        target: Optional[Slot] = next((s for s in slots if s.id == slot_id), None)
+        target = await db.get_slot(slot_id)
         if target:
             date_local, _ = utc_iso_to_local_str(target.slot_utc, settings.timezone)
             text, pairs = await list_times_keyboard(date_local)
@@ -244,11 +256,13 @@ async def on_confirm_booking(callback: CallbackQuery):
             else:
                 await callback.message.edit_text(text, reply_markup=times_kb(pairs))  # type: ignore[union-attr]
         return
+    if reminder_hours is not None:
+        reminder_wakeup.set()
 
     # success
+    booking_sessions.pop(tg_user.id)
     # load slot for confirmation
-    slots = await db.list_slots()
-    target: Optional[Slot] = next((s for s in slots if s.id == slot_id), None)
+    target = await db.get_slot(slot_id)
     if not target:
         await callback.answer("Произошла ошибка. Попробуйте позже.", show_alert=True)
         return
@@ -267,56 +281,83 @@ async def on_confirm_booking(callback: CallbackQuery):
     # notify admins
     note = target.note or ""
     tables_info = f"{target.available_tables}/{target.total_tables} столиков"
-    for admin_id in settings.admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=(
-                    f"Новое бронирование\n"
-                    f"Клиент: {hbold(user.full_name)} ({user.phone})\n"
-                    f"Дата: {hbold(date_local)} {hbold(time_local)}\n"
-                    f"Гостей: {hbold(guests_count)}\n"
-                    f"Слот ID: {target.id}\n"
-                    f"Примечание: {note}\n"
-                    f"Напоминание: {reminder_text}\n"
-                    f"Осталось столиков: {hbold(tables_info)}"
-                ),
-            )
-        except Exception:
-            pass
+    admin_msg = (
+        f"Новое бронирование\n"
+        f"Клиент: {hbold(user.full_name)} ({user.phone})\n"
+        f"Дата: {hbold(date_local)} {hbold(time_local)}\n"
+        f"Гостей: {hbold(guests_count)}\n"
+        f"Слот ID: {target.id}\n"
+        f"Примечание: {note}\n"
+        f"Напоминание: {reminder_text}\n"
+        f"Осталось столиков: {hbold(tables_info)}"
+    )
+    # Sent in the background so the callback handler finishes without waiting on the admins
+    task = asyncio.create_task(_notify_admins(admin_msg))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _notify_admins(text: str) -> None:
+    admin_ids = list(settings.admin_ids)
+    results = await asyncio.gather(
+        *(bot.send_message(chat_id=admin_id, text=text) for admin_id in admin_ids),
+        return_exceptions=True,
+    )
+    for admin_id, result in zip(admin_ids, results):
+        if isinstance(result, Exception):
+            logger.warning("Failed to notify admin %s: %s", admin_id, result)
+
+
+# callback_data is "<action>" or "<action>:<payload>"; a single handler dispatches on the action
+_CALLBACK_HANDLERS: Dict[str, Callable[[CallbackQuery, str], Awaitable[None]]] = {
+    "refresh_dates": on_refresh_dates,
+    "choose_date": on_choose_date,
+    "back_to_dates": on_back_to_dates,
+    "cancel": on_cancel,
+    "select_time": on_select_time,
+    "guests": on_guests_count,
+    "reminder": on_reminder_setting,
+    "confirm_booking": on_confirm_booking,
+}
+
+
+@router.callback_query(F.data)
+async def on_callback(callback: CallbackQuery):
+    action, _, payload = callback.data.partition(":")  # type: ignore[union-attr]
+    handler = _CALLBACK_HANDLERS.get(action)
+    if handler is None:
+        await callback.answer()
+        return
+    await handler(callback, payload)
 
 
 # Admin commands
 
-def _is_admin(user_id: int) -> bool:
-    return user_id in settings.admin_ids
+# Checked by the router, so messages from non-admins never reach the handlers
+admin_only = F.from_user.id.in_(settings.admin_ids)
 
 
-@router.message(Command(commands=["addslot"]))
+@router.message(Command(commands=["addslot"]), admin_only)
 async def cmd_addslot(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=3)
     if len(parts) < 3:
         await message.reply("Использование: /addslot YYYY-MM-DD HH:MM [длительность_мин] [количество_столиков] [примечание]")
         return
     date_str, time_str = parts[1], parts[2]
-    duration = 60
-    total_tables = 1
-    note = None
-    
-    # Парсим параметры
-    for part in parts[3:]:
-        if part.isdigit():
-            if duration == 60:  # Первое число - длительность
-                duration = int(part)
-            else:  # Второе число - количество столиков
-                total_tables = int(part)
-        else:
-            # Не число - примечание
-            note = " ".join(parts[parts.index(part):])
+
+    # Парсим параметры: до двух чисел (длительность, количество столиков), остаток строки - примечание
+    rest = parts[3] if len(parts) > 3 else ""
+    numbers: List[int] = []
+    while rest and len(numbers) < 2:
+        head, *tail = rest.split(maxsplit=1)
+        if not head.isdigit():
             break
-    
+        numbers.append(int(head))
+        rest = tail[0] if tail else ""
+    duration = numbers[0] if numbers else 60
+    total_tables = numbers[1] if len(numbers) > 1 else 1
+    note = rest or None
+
     local_dt = f"{date_str} {time_str}"
     utc_iso = local_to_utc_iso(local_dt, settings.timezone)
     slot_id = await db.add_slot(utc_iso, duration_minutes=duration, note=note, created_by=message.from_user.id, total_tables=total_tables)  # type: ignore[arg-type]
@@ -324,96 +365,89 @@ async def cmd_addslot(message: Message):
     await message.reply(f"Слот добавлен: {d_loc} {t_loc} (ID {slot_id}, {total_tables} столиков)")
 
 
-@router.message(Command(commands=["addslots"]))
+@router.message(Command(commands=["addslots"]), admin_only)
 async def cmd_addslots(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=2)
     if len(parts) < 3:
         await message.reply("Использование: /addslots YYYY-MM-DD HH:MM [HH:MM ...] [длительность_мин]")
         return
-    date_str = parts[1]
+    date_str, rest = parts[1], parts[2]
     times: List[str] = []
     duration = 60
-    # Parse times until non-time token
-    for token in parts[2:]:
-        if ":" in token and len(token) <= 5:
-            times.append(token)
-        elif token.isdigit():
-            duration = int(token)
+    # Consume leading time / number tokens until the first one that is neither
+    pos = 0
+    while (m := _HHMM_OR_NUM.match(rest, pos)) is not None:
+        hhmm, number = m.groups()
+        if hhmm is not None:
+            times.append(hhmm)
         else:
-            # ignore
-            pass
+            duration = int(number)
+        pos = m.end()
     if not times:
         await message.reply("Укажите хотя бы одно время HH:MM")
         return
-    created: List[int] = []
-    for t in times:
-        utc_iso = local_to_utc_iso(f"{date_str} {t}", settings.timezone)
-        slot_id = await db.add_slot(utc_iso, duration_minutes=duration, created_by=message.from_user.id)  # type: ignore[arg-type]
-        created.append(slot_id)
-    await message.reply(f"Добавлено слотов: {len(created)} на {date_str}")
+    items = [
+        (local_to_utc_iso(f"{date_str} {t}", settings.timezone), duration, None, message.from_user.id)  # type: ignore[union-attr]
+        for t in times
+    ]
+    created = await db.add_slots_bulk(items)
+    await message.reply(f"Добавлено слотов: {created} на {date_str}")
 
 
-@router.message(Command(commands=["listfree"]))
+@router.message(Command(commands=["listfree"]), admin_only)
 async def cmd_listfree(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
-    date_only = parts[1] if len(parts) >= 2 else None
-    free = await db.list_free_slots(since_utc_iso=datetime.now(timezone.utc).isoformat(), date_only=None)
-    if date_only:
-        # filter by local date
-        filtered = []
-        for s in free:
-            d_loc, t_loc = utc_iso_to_local_str(s.slot_utc, settings.timezone)
-            if d_loc == date_only:
-                filtered.append((s.id, d_loc, t_loc))
-        free_pairs = filtered
-    else:
-        free_pairs = [(s.id, *utc_iso_to_local_str(s.slot_utc, settings.timezone)) for s in free]
-    if not free_pairs:
+    parts = message.text.split(maxsplit=2)
+    since = _now_iso_minute(int(time.time()) // 60)
+    until = None
+    if len(parts) >= 2:
+        try:
+            day_start, until = local_day_utc_bounds(parts[1], settings.timezone)
+        except ValueError:
+            await message.reply("Использование: /listfree [YYYY-MM-DD]")
+            return
+        since = max(since, day_start)
+    free = await db.list_free_slots(since_utc_iso=since, until_utc_iso=until)
+    body = "\n".join(
+        f"ID {s.id}: {d} {t} ({s.available_tables}/{s.total_tables} столиков)"
+        for s in free
+        for d, t in (utc_iso_to_local_str(s.slot_utc, settings.timezone),)
+    )
+    if not body:
         await message.reply("Свободных слотов нет")
         return
-    lines = []
-    for sid, d, t in free_pairs:
-        # Получаем информацию о слоте
-        slots = await db.list_slots()
-        slot = next((s for s in slots if s.id == sid), None)
-        if slot:
-            lines.append(f"ID {sid}: {d} {t} ({slot.available_tables}/{slot.total_tables} столиков)")
-        else:
-            lines.append(f"ID {sid}: {d} {t}")
-    await message.reply("Свободные слоты:\n" + "\n".join(lines))
+    await message.reply("Свободные слоты:\n" + body)
 
 
-@router.message(Command(commands=["listbookings"]))
+def _booking_line(b: Booking, u: User, s: Slot, d: str, t: str) -> str:
+    reminder_text = f"напоминание за {b.reminder_hours_before}ч" if b.reminder_enabled and b.reminder_hours_before else "без напоминания"
+    table_info = f" ({s.note})" if s.note else ""
+    tables_info = f" [{s.available_tables}/{s.total_tables} столиков]"
+    return f"{d} {t}{table_info}{tables_info} — {u.full_name} ({u.phone}), {b.guests_count} гостей, {reminder_text}, booking #{b.id}"
+
+
+@router.message(Command(commands=["listbookings"]), admin_only)
 async def cmd_listbookings(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
-    date_only = parts[1] if len(parts) >= 2 else None
-    rows = await db.list_bookings()
-    if date_only:
-        rows = [r for r in rows if utc_iso_to_local_str(r[2].slot_utc, settings.timezone)[0] == date_only]
-    if not rows:
+    parts = message.text.split(maxsplit=2)
+    utc_range = None
+    if len(parts) >= 2:
+        try:
+            utc_range = local_day_utc_bounds(parts[1], settings.timezone)
+        except ValueError:
+            await message.reply("Использование: /listbookings [YYYY-MM-DD]")
+            return
+    lines = [
+        _booking_line(b, u, s, *utc_iso_to_local_str(s.slot_utc, settings.timezone))
+        async for b, u, s in db.iter_bookings(utc_range=utc_range)
+    ]
+    if not lines:
         await message.reply("Бронирований нет")
         return
-    lines = []
-    for b, u, s in rows:
-        d, t = utc_iso_to_local_str(s.slot_utc, settings.timezone)
-        reminder_text = f"напоминание за {b.reminder_hours_before}ч" if b.reminder_enabled and b.reminder_hours_before else "без напоминания"
-        table_info = f" ({s.note})" if s.note else ""
-        tables_info = f" [{s.available_tables}/{s.total_tables} столиков]"
-        lines.append(f"{d} {t}{table_info}{tables_info} — {u.full_name} ({u.phone}), {b.guests_count} гостей, {reminder_text}, booking #{b.id}")
     await message.reply("Бронирования:\n" + "\n".join(lines))
 
 
-@router.message(Command(commands=["delslot"]))
+@router.message(Command(commands=["delslot"]), admin_only)
 async def cmd_delslot(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=2)
     if len(parts) < 2 or not parts[1].isdigit():
         await message.reply("Использование: /delslot SLOT_ID")
         return
@@ -425,16 +459,14 @@ async def cmd_delslot(message: Message):
         await message.reply("Слот не найден или уже удалён")
 
 
-@router.message(Command(commands=["addnote"]))
+@router.message(Command(commands=["addnote"]), admin_only)
 async def cmd_addnote(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=2)
     if len(parts) < 3 or not parts[1].isdigit():
         await message.reply("Использование: /addnote SLOT_ID примечание")
         return
     slot_id = int(parts[1])
-    note = " ".join(parts[2:])
+    note = parts[2]
     updated = await db.update_slot_note(slot_id, note)
     if updated:
         await message.reply(f"Примечание к слоту {slot_id} обновлено: {note}")
@@ -442,11 +474,9 @@ async def cmd_addnote(message: Message):
         await message.reply("Слот не найден")
 
 
-@router.message(Command(commands=["settables"]))
+@router.message(Command(commands=["settables"]), admin_only)
 async def cmd_settables(message: Message):
-    if not _is_admin(message.from_user.id):  # type: ignore[arg-type]
-        return
-    parts = message.text.split()
+    parts = message.text.split(maxsplit=3)
     if len(parts) < 3 or not parts[1].isdigit() or not parts[2].isdigit():
         await message.reply("Использование: /settables SLOT_ID количество_столиков")
         return
@@ -460,28 +490,60 @@ async def cmd_settables(message: Message):
 
 
 async def reminder_worker() -> None:
-    await db.init()
     while True:
-        now_utc = datetime.now(timezone.utc)
+        # Cleared before querying so a booking made while we work still wakes the next wait
+        reminder_wakeup.clear()
+        timeout: Optional[float] = None
+        now_epoch = int(time.time())
         try:
-            candidates = await db.find_bookings_for_reminder(now_utc)
+            candidates = await db.find_bookings_for_reminder(now_epoch)
             if candidates:
+                sends = []
                 for booking_id, chat_id, slot_id, slot_iso, reminder_hours in candidates:
                     d, t = utc_iso_to_local_str(slot_iso, settings.timezone)
-                    try:
-                        await bot.send_message(chat_id, f"Напоминание: вы записаны на {d} в {t} (через {reminder_hours} час(ов))")
-                        await db.mark_reminder_sent(booking_id)
-                    except Exception as e:
-                        logger.exception("Failed to send reminder: %s", e)
+                    sends.append(bot.send_message(chat_id, f"Напоминание: вы записаны на {d} в {t} (через {reminder_hours} час(ов))"))
+                results = await asyncio.gather(*sends, return_exceptions=True)
+                sent_ids = []
+                for (booking_id, *_), result in zip(candidates, results):
+                    if isinstance(result, Exception):
+                        logger.warning("Failed to send reminder for booking %s: %s", booking_id, result)
+                    else:
+                        sent_ids.append(booking_id)
+                await db.mark_reminders_sent(sent_ids)
+            due = await db.next_reminder_due(now_epoch)
+            if due is not None:
+                timeout = max(0.0, due - time.time())
         except Exception as e:
             logger.exception("Reminder worker error: %s", e)
-        await asyncio.sleep(60)
+            timeout = 60
+        # Sleep until the next reminder is due or a new booking arrives
+        try:
+            await asyncio.wait_for(reminder_wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def optimize_worker() -> None:
+    while True:
+        await asyncio.sleep(15 * 60)
+        try:
+            await db.optimize()
+        except Exception as e:
+            logger.exception("Database optimize failed: %s", e)
 
 
 async def main() -> None:
     await db.init()
-    asyncio.create_task(reminder_worker())
-    await dp.start_polling(bot)
+    workers = [asyncio.create_task(reminder_worker()), asyncio.create_task(optimize_worker())]
+    try:
+        # Long polls cut idle getUpdates round trips; the task limit bounds handlers running at once
+        await dp.start_polling(bot, polling_timeout=25, tasks_concurrency_limit=256)
+    finally:
+        # Stop the workers first so none of them touches the pool while it is being closed
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await db.close()
 
 
 if __name__ == "__main__":
@@ -27,6 +27,7 @@ async def test_database():
         # Тестируем подключение к базе данных
         db = Database(settings.database_path)
         await db.init()
+        await db.close()
         print("✅ Подключение к базе данных успешно")
         
         # Тестируем создание таблиц
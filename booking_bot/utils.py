@@ -1,33 +1,95 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Tuple, List
-import pytz
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, Optional, Tuple, List
+from zoneinfo import ZoneInfo
+
+if TYPE_CHECKING:
+    from db import Slot
+
+
+@lru_cache(maxsize=8)
+def _tz(name: str) -> ZoneInfo:
+    # timezone objects are built once per name and reused by every conversion
+    return ZoneInfo(name)
+
+
+# The ASCII digit fields strptime("%Y-%m-%d %H:%M") accepts, separated by a single space, without
+# strptime's per-call overhead; fromisoformat would reject unpadded input like "2030-5-1 9:30"
+_LOCAL_DT = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2})", re.ASCII)
+
+
+def _parse_iso(iso: str) -> datetime:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00"))
 
 
 def local_to_utc_iso(local_dt_str: str, tz_name: str) -> str:
     # local_dt_str: "YYYY-MM-DD HH:MM"
-    tz = pytz.timezone(tz_name)
-    naive = datetime.strptime(local_dt_str, "%Y-%m-%d %H:%M")
-    local = tz.localize(naive)
-    return local.astimezone(pytz.utc).isoformat()
+    tz = _tz(tz_name)
+    m = _LOCAL_DT.fullmatch(local_dt_str)
+    if m is None:
+        raise ValueError(f"time data {local_dt_str!r} does not match format 'YYYY-MM-DD HH:MM'")
+    year, month, day, hour, minute = map(int, m.groups())
+    local = datetime(year, month, day, hour, minute, tzinfo=tz)
+    return local.astimezone(timezone.utc).isoformat()
+
+
+def local_day_utc_bounds(date_local: str, tz_name: str) -> Tuple[str, str]:
+    # returns UTC ISO [start, end) of the local day date_local (YYYY-MM-DD)
+    next_day = (date.fromisoformat(date_local) + timedelta(days=1)).isoformat()
+    return local_to_utc_iso(f"{date_local} 00:00", tz_name), local_to_utc_iso(f"{next_day} 00:00", tz_name)
 
 
+@lru_cache(maxsize=8192)
 def utc_iso_to_local_str(utc_iso: str, tz_name: str) -> Tuple[str, str]:
     # returns (date_str YYYY-MM-DD, time_str HH:MM)
-    tz = pytz.timezone(tz_name)
-    dt_utc = datetime.fromisoformat(utc_iso)
+    # memoized: the same slot_utc values are converted again on every listing and refresh
+    tz = _tz(tz_name)
+    dt_utc = _parse_iso(utc_iso)
     local = dt_utc.astimezone(tz)
-    return local.strftime("%Y-%m-%d"), local.strftime("%H:%M")
-
-
-def unique_sorted_dates_local(utc_isos: List[str], tz_name: str) -> List[str]:
-    seen = set()
-    dates: List[str] = []
-    for iso in utc_isos:
-        d, _ = utc_iso_to_local_str(iso, tz_name)
-        if d not in seen:
-            seen.add(d)
-            dates.append(d)
-    dates.sort()
-    return dates
\ No newline at end of file
+    return local.date().isoformat(), f"{local.hour:02d}:{local.minute:02d}"
+
+
+def group_free_by_local_date(slots: Iterable[Slot], tz_name: str) -> Dict[str, List[Tuple[int, str, Optional[str], int]]]:
+    # returns {date_str: [(slot_id, time_str, note, available_tables), ...]} with each day sorted by time
+    buckets: Dict[str, List[Tuple[int, str, Optional[str], int]]] = {}
+    for s in slots:
+        d, t = utc_iso_to_local_str(s.slot_utc, tz_name)
+        buckets.setdefault(d, []).append((s.id, t, s.note, s.available_tables))
+    for pairs in buckets.values():
+        pairs.sort(key=lambda p: p[1])
+    return buckets
+
+
+class TTLCache:
+    """Dict-like cache whose entries expire after ttl seconds.
+
+    Holds at most maxsize entries; when full, the oldest inserted entry is dropped.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return default
+        return item[1]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self._data.pop(key, None)
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+        self._data[key] = (time.monotonic() + self.ttl, value)